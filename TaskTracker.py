@@ -6,95 +6,405 @@
 import os
 import sys
 import json 
+from contextlib import contextmanager
 from datetime import datetime
-from enum import Enum
+from enum import IntEnum
 
-class TaskStatus(Enum):
-    TODO = "todo"               #0
-    IN_PROGRESS = "in-progress" #1
-    DONE = "done"               #2
+#orjson is optional, fall back to the stdlib json module without it
+try:
+    import orjson
+    _loads = orjson.loads
+    def _dumps(obj):
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+    def _dumps_line(obj):
+        return orjson.dumps(obj).decode()
+except ImportError:
+    _loads = json.loads
+    def _dumps(obj):
+        return json.dumps(obj, indent=2)
+    def _dumps_line(obj):
+        return json.dumps(obj)
+
+class TaskStatus(IntEnum):
+    TODO = 0                    #"todo"
+    IN_PROGRESS = 1             #"in-progress"
+    DONE = 2                    #"done"
+
+#Status names as stored in the tasks file, indexed by TaskStatus
+_STATUS_STRS = ("todo", "in-progress", "done")
+_STATUS_FROM_STR = {name: TaskStatus(i) for i, name in enumerate(_STATUS_STRS)}
 
 class Task:
+    __slots__ = ('id', 'taskDesc', 'status', 'createdOn', '_dict')
+
     def __init__(self, task_id, taskDesc="", status=TaskStatus.TODO, createdOn=None):
         self.id = task_id
         self.taskDesc = taskDesc
         self.createdOn = createdOn or datetime.now().isoformat()
-        self.status = TaskStatus(status)
+        self.status = _STATUS_FROM_STR[status] if type(status) is str else TaskStatus(status)
+        self._dict = None   #cached _row(), cleared on every change
+
+    @classmethod
+    def _from_raw(cls, task_data):
+        #Trusted rows from the tasks file, skips the __init__ defaults
+        task = cls.__new__(cls)
+        task.id = task_data['id']
+        task.taskDesc = task_data['description']
+        task.status = _STATUS_FROM_STR[task_data['status']]
+        task.createdOn = task_data['created']
+        task._dict = task_data  #row is already in _row() shape
+        return task
     
     def markTD(self):
         self.status = TaskStatus.TODO
+        self._dict = None
     
     def markIP(self):
         self.status = TaskStatus.IN_PROGRESS
+        self._dict = None
 
     def markD(self):
         self.status = TaskStatus.DONE
+        self._dict = None
     
     def updateDesc(self, new_desc):
         self.taskDesc = new_desc
+        self._dict = None
     
     def task_dict(self):
-        return {
-            'id' : self.id,
-            'description' : self.taskDesc,
-            'status' : self.status.value,
-            'created' : self.createdOn
-        }
+        return dict(self._row())
+
+    def _row(self):
+        #Shared cached dict for save_task and the journal, never hand it out
+        if self._dict is None:
+            self._dict = {
+                'id' : self.id,
+                'description' : self.taskDesc,
+                'status' : _STATUS_STRS[self.status],
+                'created' : self.createdOn
+            }
+        return self._dict
 
     def __str__(self):
-        return f"[{self.id}]\t/{self.status}/\t{self.taskDesc}\t{self.createdOn}"
+        return f"[{self.id}]\t/{_STATUS_STRS[self.status]}/\t{self.taskDesc}\t{self.createdOn}"
+
+_MARK = {TaskStatus.TODO: Task.markTD, TaskStatus.IN_PROGRESS: Task.markIP, TaskStatus.DONE: Task.markD}
 
 class TaskTracker:
+    #Compact the journal into the tasks file once it grows past either limit
+    JOURNAL_MAX_RECORDS = 100
+    JOURNAL_MAX_BYTES = 1 << 20
+
     def __init__(self, filename="tasks.json"):
         self.filename = filename
-        self.tasks = {}
+        self.journal = filename + ".log"
+        self.tasks = {}         #int task id -> Task, keys are only str in the file
+        self._buffering = 0     #nesting depth of buffered() blocks
+        self._dirty = False     #unsaved changes made while buffering
+        self._max_id = 0        #highest id in use, reseeded from the tasks file on load
+        self._last_payload = None   #last contents written by save_task
+        self._last_stat = None      #(size, mtime) of the tasks file after that write
+        self._by_status = {status: set() for status in TaskStatus}  #status -> task ids
+        self._journal_records = 0   #records appended since the last save_task
+        self._journal_bytes = 0
+        self._journal_torn = False  #journal ends mid-line after a crash
         #self.load_tasks()
     
     def load_tasks(self):
-        if os.path.exists(self.filename):
-            with open(self.filename, 'r') as f:
-                data = json.load(f)
-                for task_id, task_data in data.items():
-                    task = Task(
-                        task_id=task_data['id'],
-                        taskDesc=task_data['description'],
-                        status=task_data['status'],
-                        createdOn=task_data['created']
-                    )
-                    self.tasks[str(task.id)] = task
+        try:
+            f = open(self.filename, 'rb')
+        except FileNotFoundError:
+            data = {}
+        else:
+            with f:
+                raw = f.read()
+            #Older versions could leave an empty tasks file behind
+            data = _loads(raw) if raw else {}
+        for task_id, task_data in data.items():
+            self._put(Task._from_raw(task_data))
+        self._replay_journal()
+        #Keep self.tasks in id order, new ids are always appended after this
+        self.tasks = dict(sorted(self.tasks.items()))
+        self._max_id = max(self.tasks, default=self._max_id)
+
+    def _replay_journal(self):
+        try:
+            f = open(self.journal, 'rb')
+        except FileNotFoundError:
+            return
+        with f:
+            raw = f.read()
+        for line in raw.splitlines():
+            try:
+                record = _loads(line)
+            except ValueError:
+                continue    #torn append from a crash
+            self._replay(record)
+            self._journal_records += 1
+        self._journal_bytes += len(raw)
+        self._journal_torn = bool(raw) and not raw.endswith(b"\n")
+
+    def _replay(self, record):
+        #Records hold the resulting value, so replaying one twice is harmless
+        op = record['op']
+        if op == 'add':
+            self._put(Task._from_raw(record['task']))
+            return
+        task = self.tasks.get(record['id'])
+        if task is None:
+            return
+        if op == 'update':
+            task.updateDesc(record['description'])
+        elif op == 'status':
+            self._set_status(task, _STATUS_FROM_STR[record['status']])
+        elif op == 'delete':
+            self._remove(task)
 
     def save_task(self):
-        data = {str(task_id): task.task_dict() for task_id, task in self.tasks.items()}
-        with open(self.filename, 'w') as f:
-            json.dumps(data, f, indent=2)
+        data = {str(task_id): task._row() for task_id, task in self.tasks.items()}
+        payload = _dumps(data)
+        compacting = self._journal_records or self._journal_bytes
+        #Only skip when nothing needs compacting and the file is still the one we wrote
+        if compacting or payload != self._last_payload or not self._unchanged_on_disk():
+            #Write a temp file and swap it in so a crash never leaves a torn tasks file
+            tmp = self.filename + ".tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(payload)
+            os.replace(tmp, self.filename)
+            self._last_payload = payload
+            st = os.stat(self.filename)
+            self._last_stat = (st.st_size, st.st_mtime_ns)
+        #Everything in the journal is now in the tasks file
+        if compacting:
+            try:
+                os.remove(self.journal)
+            except FileNotFoundError:
+                pass
+            self._journal_records = 0
+            self._journal_bytes = 0
+            self._journal_torn = False
+
+    def _unchanged_on_disk(self):
+        try:
+            st = os.stat(self.filename)
+        except FileNotFoundError:
+            return False
+        return (st.st_size, st.st_mtime_ns) == self._last_stat
+
+    def flush(self):
+        if self._dirty:
+            self.save_task()
+            self._dirty = False
+
+    @contextmanager
+    def buffered(self):
+        #Defer saving until the outermost block exits, one write per batch
+        self._buffering += 1
+        try:
+            yield self
+        finally:
+            self._buffering -= 1
+            if not self._buffering:
+                self.flush()
+
+    def _changed(self, record):
+        if self._buffering:
+            self._dirty = True
+        else:
+            self._log(record)
+
+    def _log(self, record):
+        #Append one journal line instead of rewriting the whole tasks file
+        line = _dumps_line(record) + "\n"
+        if self._journal_torn:
+            #End the torn fragment first so this record gets a line of its own
+            line = "\n" + line
+        data = line.encode('utf-8')
+        with open(self.journal, 'ab') as f:
+            f.write(data)
+        self._journal_torn = False
+        self._journal_records += 1
+        self._journal_bytes += len(data)
+        if (self._journal_records >= self.JOURNAL_MAX_RECORDS
+                or self._journal_bytes >= self.JOURNAL_MAX_BYTES):
+            self.save_task()
+
+    def _put(self, task):
+        old = self.tasks.get(task.id)
+        if old is not None:
+            self._by_status[old.status].discard(old.id)
+        self.tasks[task.id] = task
+        self._by_status[task.status].add(task.id)
+
+    def _remove(self, task):
+        del self.tasks[task.id]
+        self._by_status[task.status].discard(task.id)
+
+    def _set_status(self, task, status):
+        self._by_status[task.status].discard(task.id)
+        _MARK[status](task)
+        self._by_status[task.status].add(task.id)
 
     def next_task_id(self):
-        if not self.tasks:
-            return 1
-        return max(int(task_id) for task_id in self.tasks.keys()) + 1
+        return self._max_id + 1
 
-    def addTask(self, description="", status=TaskStatus.TODO):
-        task = Task(self.next_task_id, description, status)
-        self.tasks[str(task.id)] = task
+    def addTask(self, description="", status=TaskStatus.TODO, createdOn=None):
+        task = Task(self._max_id + 1, description, status, createdOn)
+        self._max_id = task.id
+        self._put(task)
         print(f"[Task {task.taskDesc} Added]")
+        self._changed({'op': 'add', 'task': task._row()})
+        return True
+
+    def addTasks(self, descriptions, status=TaskStatus.TODO):
+        #One timestamp and one save for the whole batch
+        now = datetime.now().isoformat()
+        with self.buffered():
+            for description in descriptions:
+                self.addTask(description, status, now)
+        return True
+
+    def getTask(self, task_id):
+        task = self.tasks.get(task_id)
+        if task is None:
+            print(f"[Task {task_id} Not Found]")
+        return task
+
+    def updateTask(self, task_id, new_desc):
+        task = self.getTask(task_id)
+        if task is None:
+            return False
+        if task.taskDesc == new_desc:
+            return True
+        task.updateDesc(new_desc)
+        self._changed({'op': 'update', 'id': task.id, 'description': new_desc})
+        return True
+
+    def deleteTask(self, task_id):
+        task = self.getTask(task_id)
+        if task is None:
+            return False
+        self._remove(task)
+        self._changed({'op': 'delete', 'id': task.id})
+        return True
+
+    def markInProgress(self, task_id):
+        task = self.getTask(task_id)
+        if task is None:
+            return False
+        if task.status is TaskStatus.IN_PROGRESS:
+            return True
+        self._set_status(task, TaskStatus.IN_PROGRESS)
+        self._changed({'op': 'status', 'id': task.id, 'status': "in-progress"})
+        return True
+
+    def markDone(self, task_id):
+        task = self.getTask(task_id)
+        if task is None:
+            return False
+        if task.status is TaskStatus.DONE:
+            return True
+        self._set_status(task, TaskStatus.DONE)
+        self._changed({'op': 'status', 'id': task.id, 'status': "done"})
+        return True
+
+    def getAllTasks(self):
+        return list(self.tasks.values())
+
+    def getTasksByStatus(self, status):
+        if type(status) is str:
+            status = _STATUS_FROM_STR[status]
+        return [self.tasks[task_id] for task_id in sorted(self._by_status[status])]
 
 
 
     
-#Tests######################################
+class CLI:
+    def __init__(self, filename="tasks.json"):
+        self.tracker = TaskTracker(filename)
+        self.tracker.load_tasks()
+        #command -> (handler, min args, max args, last arg takes the rest of argv)
+        self._dispatch = {
+            'add' : (self.add_command, 1, None, True),
+            'update' : (self.update_command, 2, None, True),
+            'delete' : (self.delete_command, 1, 1, False),
+            'mark-in-progress' : (self.mark_in_progress_command, 1, 1, False),
+            'mark-done' : (self.mark_done_command, 1, 1, False),
+            'list' : (self.list_command, 0, 1, False),
+        }
+
+    def run(self, argv=None):
+        if argv is None:
+            argv = sys.argv[1:]
+        if not argv:
+            self.help_command()
+            return
+        entry = self._dispatch.get(argv[0])
+        if entry is None:
+            self.help_command()
+            return
+        handler, min_args, max_args, joins_rest = entry
+        args = argv[1:]
+        if len(args) < min_args or (max_args is not None and len(args) > max_args):
+            self.help_command()
+            return
+        if joins_rest:
+            args = args[:min_args - 1] + [" ".join(args[min_args - 1:])]
+        handler(*args)
+
+    def _task_id(self, arg):
+        try:
+            return int(arg)
+        except ValueError:
+            print(f"[Invalid Task Id {arg}]")
+            return None
+
+    def add_command(self, description):
+        self.tracker.addTask(description)
+
+    def update_command(self, task_id, description):
+        task_id = self._task_id(task_id)
+        if task_id is not None:
+            self.tracker.updateTask(task_id, description)
+
+    def delete_command(self, task_id):
+        task_id = self._task_id(task_id)
+        if task_id is not None:
+            self.tracker.deleteTask(task_id)
+
+    def mark_in_progress_command(self, task_id):
+        task_id = self._task_id(task_id)
+        if task_id is not None:
+            self.tracker.markInProgress(task_id)
+
+    def mark_done_command(self, task_id):
+        task_id = self._task_id(task_id)
+        if task_id is not None:
+            self.tracker.markDone(task_id)
 
-task1 = Task(1, "Make Program")
-print(task1)
+    def list_command(self, status=None):
+        if status is None:
+            tasks = self.tracker.getAllTasks()
+        elif status in _STATUS_FROM_STR:
+            tasks = self.tracker.getTasksByStatus(status)
+        else:
+            print(f"[Unknown Status {status}]")
+            return
+        for task in tasks:
+            print(task)
 
-task1.markD()
-print(task1.task_dict())
-print(task1)
+    def help_command(self):
+        print("Usage: TaskTracker.py <command> [args]")
+        print("  add <description>")
+        print("  update <id> <description>")
+        print("  delete <id>")
+        print("  mark-in-progress <id>")
+        print("  mark-done <id>")
+        print("  list [todo|in-progress|done]")
 
-tasktracker = TaskTracker()
-tasktracker.addTask("Get Milk")
-tasktracker.save_task()
 
-############################################
+if __name__ == "__main__":
+    CLI().run()
 
 
 
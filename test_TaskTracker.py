@@ -0,0 +1,164 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import ExitStack, redirect_stdout
+
+from TaskTracker import CLI, TaskStatus, TaskTracker
+
+
+class JournalTests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.filename = os.path.join(self.dir, "tasks.json")
+        #TaskTracker prints a line per action, keep the test output clean
+        stack = ExitStack()
+        stack.enter_context(redirect_stdout(io.StringIO()))
+        self.addCleanup(stack.close)
+
+    def tracker(self):
+        tracker = TaskTracker(self.filename)
+        tracker.load_tasks()
+        return tracker
+
+    def snapshot(self, tracker):
+        return [task.task_dict() for task in tracker.getAllTasks()]
+
+    def test_replay_after_mutations(self):
+        tracker = self.tracker()
+        tracker.addTasks(["a", "b", "c"])
+        tracker.markDone(1)
+        tracker.updateTask(2, "bee")
+        tracker.deleteTask(3)
+        tracker.addTask("d")
+        tracker.markInProgress(4)
+        self.assertTrue(os.path.exists(tracker.journal))
+
+        reloaded = self.tracker()
+        self.assertEqual(self.snapshot(reloaded), self.snapshot(tracker))
+        self.assertEqual([t.id for t in reloaded.getTasksByStatus("done")], [1])
+        self.assertEqual([t.id for t in reloaded.getTasksByStatus("todo")], [2])
+        self.assertEqual([t.id for t in reloaded.getTasksByStatus("in-progress")], [4])
+        self.assertEqual(reloaded.next_task_id(), 5)
+
+    def test_replay_after_crash_between_replace_and_remove(self):
+        tracker = self.tracker()
+        tracker.addTasks(["a", "b", "c"])
+        tracker.markDone(1)
+        tracker.deleteTask(3)
+        tracker.updateTask(2, "bee")
+        with open(tracker.journal, 'rb') as f:
+            journal = f.read()
+        tracker.save_task()
+        self.assertFalse(os.path.exists(tracker.journal))
+        #The tasks file was replaced but the journal was never removed
+        with open(tracker.journal, 'wb') as f:
+            f.write(journal)
+
+        reloaded = self.tracker()
+        self.assertEqual(self.snapshot(reloaded), self.snapshot(tracker))
+        self.assertEqual(reloaded.getTasksByStatus(TaskStatus.DONE)[0].id, 1)
+
+    def test_torn_tail(self):
+        tracker = self.tracker()
+        tracker.addTask("a")
+        tracker.addTask("b")
+        with open(tracker.journal, 'a') as f:
+            f.write('{"op":"upd')
+
+        survivor = self.tracker()
+        self.assertEqual(len(survivor.tasks), 2)
+        survivor.markDone(2)
+        self.assertTrue(os.path.exists(survivor.journal))
+
+        reloaded = self.tracker()
+        self.assertIs(reloaded.getTask(2).status, TaskStatus.DONE)
+        self.assertIs(reloaded.getTask(1).status, TaskStatus.TODO)
+
+    def test_compaction_rewrites_a_file_removed_behind_our_back(self):
+        tracker = self.tracker()
+        tracker.addTask("a")
+        tracker.addTask("b")
+        tracker.save_task()
+        os.remove(self.filename)
+        tracker.save_task()
+        tracker.addTask("c")
+        self.assertEqual([t.id for t in self.tracker().getAllTasks()], [1, 2, 3])
+
+    def test_compaction_writes_even_when_payload_is_unchanged(self):
+        tracker = self.tracker()
+        tracker.addTask("a")
+        tracker.save_task()
+        os.remove(self.filename)
+        tracker.JOURNAL_MAX_RECORDS = 2
+        tracker.updateTask(1, "b")
+        tracker.updateTask(1, "a")
+        self.assertFalse(os.path.exists(tracker.journal))
+        self.assertEqual(self.snapshot(self.tracker()), self.snapshot(tracker))
+
+    def test_journal_size_is_counted_in_bytes(self):
+        tracker = self.tracker()
+        tracker.addTask("caf\u00e9 \u2615")
+        tracker.updateTask(1, "th\u00e9")
+        self.assertEqual(tracker._journal_bytes, os.path.getsize(tracker.journal))
+        self.assertEqual(self.tracker()._journal_bytes, tracker._journal_bytes)
+
+    def test_status_is_validated_and_normalized(self):
+        tracker = self.tracker()
+        with self.assertRaises(ValueError):
+            tracker.addTask("x", status=5)
+        self.assertEqual(tracker.tasks, {})
+        self.assertEqual(tracker.next_task_id(), 1)
+        tracker.addTask("y", status=2)
+        self.assertIs(tracker.getTask(1).status, TaskStatus.DONE)
+        tracker.save_task()
+        self.assertIs(self.tracker().getTask(1).status, TaskStatus.DONE)
+
+    def test_threshold_compaction(self):
+        tracker = self.tracker()
+        tracker.JOURNAL_MAX_RECORDS = 3
+        tracker.addTask("a")
+        tracker.addTask("b")
+        self.assertFalse(os.path.exists(self.filename))
+        tracker.markDone(1)
+        self.assertFalse(os.path.exists(tracker.journal))
+        self.assertTrue(os.path.exists(self.filename))
+
+        reloaded = self.tracker()
+        self.assertEqual(self.snapshot(reloaded), self.snapshot(tracker))
+
+
+class CLITests(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.filename = os.path.join(self.dir, "tasks.json")
+
+    def run_cli(self, *argv):
+        out = io.StringIO()
+        with redirect_stdout(out):
+            CLI(self.filename).run(list(argv))
+        return out.getvalue()
+
+    def test_descriptions_take_the_rest_of_argv(self):
+        self.run_cli("add", "buy", "milk")
+        self.run_cli("update", "1", "buy", "oat", "milk")
+        self.assertIn("buy oat milk", self.run_cli("list"))
+
+    def test_empty_tasks_file_is_no_tasks(self):
+        open(self.filename, 'w').close()
+        self.assertEqual(self.run_cli("list"), "")
+        self.run_cli("add", "x")
+        self.assertIn("/todo/\tx", self.run_cli("list"))
+
+    def test_extra_arguments_print_usage(self):
+        self.run_cli("add", "a")
+        for argv in (("list", "done", "extra"), ("delete", "1", "2"), ("mark-done", "1", "2")):
+            self.assertTrue(self.run_cli(*argv).startswith("Usage:"), argv)
+        self.assertIn("/todo/", self.run_cli("list"))
+
+
+if __name__ == "__main__":
+    unittest.main()